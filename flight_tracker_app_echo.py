@@ -16,16 +16,22 @@ Correções aplicadas nesta versão:
 # Importação de Bibliotecas
 # ========================
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
+import numpy as np
 import pandas as pd
+import re
 import requests
-from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone, tzinfo
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from airportsdata import load
-from geopy.distance import geodesic
 import folium
 from streamlit_folium import st_folium
 
+# Núcleos de cálculo em módulos próprios: o Streamlit reexecuta este script a
+# cada rerun, mas módulos importados (com seus caches e código Numba) persistem.
+from geo import calcular_distancia, indices_mais_proximos
+from perfil_voo import PerfilVoo, calcular_perfil_base
+
 # ========================
 # Configuração do App
 # ========================
@@ -35,9 +41,75 @@ st.markdown("Estimativa de tempo de voo teórico e rastreamento em tempo real de
 
 # ========================
 # Carregar dados dos aeroportos
+# Cache: a base ICAO (~10k entradas) é carregada uma única vez por processo.
+#   - dict bruto, DataFrame e índice derivados → st.cache_resource (guardados
+#     por referência, sem hash/pickle a cada acesso). São somente leitura.
+#   - DataFrame e índice são montados sob demanda: no modo "Por código ICAO"
+#     só o dict é usado, sem DataFrame algum.
 # ========================
-airports = load('ICAO')
-df_airports = pd.DataFrame(airports).T.dropna(subset=['lat', 'lon'])
+
+@st.cache_resource(show_spinner=False)
+def carregar_base_icao():
+    """Base ICAO do airportsdata — somente leitura, compartilhada entre sessões."""
+    return load('ICAO')
+
+
+@st.cache_resource(show_spinner=False)
+def tabela_aeroportos():
+    """
+    Monta o DataFrame de aeroportos com coordenadas a partir da base ICAO.
+    País e cidade ausentes são preenchidos com 'Desconhecido'.
+    Compartilhado por referência — não modificar.
+    """
+    df = (
+        pd.DataFrame.from_dict(carregar_base_icao(), orient='index')
+        .dropna(subset=['lat', 'lon'])
+        .astype({'lat': 'float32', 'lon': 'float32'})
+    )
+    df['country'] = df['country'].fillna('Desconhecido')
+    df['city']    = df['city'].fillna('Desconhecido')
+    return df
+
+
+@st.cache_resource(show_spinner=False)
+def indice_pais_cidade():
+    """
+    Índice {país: {cidade: {"ICAO — nome": icao}}}, com países e cidades já em
+    ordem alfabética, usado na seleção por país e cidade: os rótulos dos
+    selectboxes saem prontos e o ICAO é obtido direto do dict.
+    """
+    df = tabela_aeroportos()
+    indice = {}
+    for icao, pais, cidade, nome in zip(df.index, df['country'], df['city'], df['name']):
+        indice.setdefault(pais, {}).setdefault(cidade, {})[f"{icao} — {nome}"] = icao
+    indice = {
+        pais: {cidade: indice[pais][cidade] for cidade in sorted(indice[pais])}
+        for pais in sorted(indice)
+    }
+    return indice
+
+
+@st.cache_resource(show_spinner=False)
+def coordenadas_aeroportos_rad():
+    """Arrays (lat, lon) em radianos, na mesma ordem das linhas de tabela_aeroportos()."""
+    df = tabela_aeroportos()
+    return (
+        np.radians(df['lat'].to_numpy(np.float64)),
+        np.radians(df['lon'].to_numpy(np.float64)),
+    )
+
+
+def aeroportos_mais_proximos(lat: float, lon: float, k: int = 5) -> pd.DataFrame:
+    """
+    Retorna os k aeroportos mais próximos de (lat, lon), do mais perto ao mais longe,
+    com a coluna 'dist_km'. O cálculo vetorizado fica em geo.indices_mais_proximos.
+    """
+    df = tabela_aeroportos()
+    idx, dist_km = indices_mais_proximos(*coordenadas_aeroportos_rad(), lat, lon, k)
+    return df.iloc[idx].assign(dist_km=dist_km)
+
+
+airports = carregar_base_icao()
 
 # ========================
 # Parâmetros das Aeronaves
@@ -73,15 +145,26 @@ aeronaves = {
     },
 }
 
+
+def derivar_fases(param: dict) -> dict:
+    """
+    Acrescenta a param os tempos (h) e distâncias (km) de subida e descida.
+    Dependem só da aeronave, não da rota — calculados uma vez, não a cada perfil.
+    """
+    param['t_subida_h']   = param['altitude_cruzeiro_ft'] / param['razao_subida_fpm']  / 60
+    param['t_descida_h']  = param['altitude_cruzeiro_ft'] / param['razao_descida_fpm'] / 60
+    param['d_subida_km']  = param['vel_subida_kmh']  * param['t_subida_h']
+    param['d_descida_km'] = param['vel_descida_kmh'] * param['t_descida_h']
+    return param
+
+
+for parametros in aeronaves.values():
+    derivar_fases(parametros)
+
 # ========================
 # Funções de Cálculo
 # ========================
 
-def calcular_distancia(lat1, lon1, lat2, lon2):
-    """Calcula distância geográfica entre dois pontos em km."""
-    return geodesic((lat1, lon1), (lat2, lon2)).kilometers
-
-
 def calcular_perfil_de_voo(
     distancia_total_km: float,
     tipo_aeronave: str = None,
@@ -92,70 +175,60 @@ def calcular_perfil_de_voo(
     vel_descida_kmh: float = None,
     razao_subida_fpm: int = None,
     razao_descida_fpm: int = None,
-):
+) -> PerfilVoo:
     """
     Calcula o perfil de voo considerando parâmetros específicos da aeronave.
 
-    CORREÇÃO 5: trata corretamente voos curtos onde a soma das fases de subida
-    e descida ultrapassa a distância total (sem fase de cruzeiro real).
-    Retorna dict com subida, cruzeiro, descida, tempo_total_h e altitude_cruzeiro_ft.
+    Resolve os parâmetros (catálogo ou Custom) e delega o cálculo a
+    perfil_voo.calcular_perfil_base.
+    Retorna PerfilVoo com distância/tempo por fase, tempo_total_h e altitude_cruzeiro_ft.
     """
     # Obter parâmetros conforme o tipo de aeronave
     if tipo_aeronave in aeronaves:
         param = aeronaves[tipo_aeronave]
-        altitude_cruzeiro_ft = param['altitude_cruzeiro_ft']
-        vel_subida_kmh       = param['vel_subida_kmh']
-        vel_cruzeiro_kmh     = param['vel_cruzeiro_kmh']
-        vel_descida_kmh      = param['vel_descida_kmh']
-        razao_subida_fpm     = param['razao_subida_fpm']
-        razao_descida_fpm    = param['razao_descida_fpm']
     elif tipo_aeronave == 'Custom':
         if None in [vel_custom, altitude_cruzeiro_ft, razao_subida_fpm, razao_descida_fpm]:
             raise ValueError("Para aeronave Custom, todos os parâmetros devem ser fornecidos.")
-        vel_subida_kmh   = vel_custom
-        vel_cruzeiro_kmh = vel_custom
-        vel_descida_kmh  = vel_custom
+        param = derivar_fases({
+            'altitude_cruzeiro_ft': altitude_cruzeiro_ft,
+            'vel_subida_kmh':       vel_custom,
+            'vel_cruzeiro_kmh':     vel_custom,
+            'vel_descida_kmh':      vel_custom,
+            'razao_subida_fpm':     razao_subida_fpm,
+            'razao_descida_fpm':    razao_descida_fpm,
+        })
     else:
         raise ValueError("Tipo de aeronave não especificado corretamente.")
 
-    # Tempos de subida e descida (em horas)
-    tempo_subida_h  = (altitude_cruzeiro_ft / razao_subida_fpm) / 60
-    tempo_descida_h = (altitude_cruzeiro_ft / razao_descida_fpm) / 60
-
-    # Distâncias percorridas nas fases extremas
-    d_subida_km  = vel_subida_kmh  * tempo_subida_h
-    d_descida_km = vel_descida_kmh * tempo_descida_h
-
-    # CORREÇÃO 5: voo curto — subida e descida somadas superam a distância total
-    d_fases_extremas = d_subida_km + d_descida_km
-    if distancia_total_km <= d_fases_extremas:
-        # Sem fase de cruzeiro: distribui proporcionalmente
-        proporcao = distancia_total_km / d_fases_extremas
-        d_subida_km   = d_subida_km  * proporcao
-        d_descida_km  = d_descida_km * proporcao
-        tempo_subida_h  = d_subida_km  / vel_subida_kmh  if vel_subida_kmh  > 0 else 0
-        tempo_descida_h = d_descida_km / vel_descida_kmh if vel_descida_kmh > 0 else 0
-        d_cruzeiro_km = 0.0
-        t_cruzeiro_h  = 0.0
-    else:
-        d_cruzeiro_km = distancia_total_km - d_fases_extremas
-        t_cruzeiro_h  = d_cruzeiro_km / vel_cruzeiro_kmh if vel_cruzeiro_kmh > 0 else 0
-
-    tempo_total_h = tempo_subida_h + t_cruzeiro_h + tempo_descida_h
-
-    return {
-        "subida":   {"dist_km": d_subida_km,   "tempo_h": tempo_subida_h},
-        "cruzeiro": {"dist_km": d_cruzeiro_km,  "tempo_h": t_cruzeiro_h},
-        "descida":  {"dist_km": d_descida_km,   "tempo_h": tempo_descida_h},
-        "tempo_total_h":      tempo_total_h,
-        "altitude_cruzeiro_ft": altitude_cruzeiro_ft,
-    }
+    return calcular_perfil_base(
+        float(distancia_total_km),
+        param['altitude_cruzeiro_ft'],
+        float(param['vel_subida_kmh']),
+        float(param['vel_cruzeiro_kmh']),
+        float(param['vel_descida_kmh']),
+        param['t_subida_h'],
+        param['t_descida_h'],
+        param['d_subida_km'],
+        param['d_descida_km'],
+    )
 
 
 # ========================
 # Funções de Rastreamento
 # ========================
 
+@st.cache_resource(show_spinner=False)
+def sessao_http() -> requests.Session:
+    """Sessão HTTP keep-alive compartilhada pelas três fontes de rastreamento."""
+    sessao = requests.Session()
+    sessao.headers['User-Agent'] = 'flight-tracker'
+    # Um pool por host (airplanes.live, ADSB.lol, OpenSky)
+    adaptador = HTTPAdapter(pool_connections=3, pool_maxsize=4)
+    sessao.mount('https://', adaptador)
+    return sessao
+
+
+@st.cache_data(ttl=5, show_spinner=False)
 def consultar_airplanes_live(icao24: str) -> dict | None:
     """
     Fonte primária: airplanes.live — gratuita, sem chave, 1 req/s.
@@ -164,7 +237,7 @@ def consultar_airplanes_live(icao24: str) -> dict | None:
     """
     url = f"https://api.airplanes.live/v2/hex/{icao24.lower()}"
     try:
-        resp = requests.get(url, timeout=6)
+        resp = sessao_http().get(url, timeout=6)
         resp.raise_for_status()
         data = resp.json()
         ac_list = data.get("ac", [])
@@ -191,6 +264,7 @@ def consultar_airplanes_live(icao24: str) -> dict | None:
         return None
 
 
+@st.cache_data(ttl=5, show_spinner=False)
 def consultar_adsb_lol(icao24: str) -> dict | None:
     """
     Fonte secundária: ADSB.lol — gratuita, open-source, sem chave obrigatória.
@@ -198,7 +272,7 @@ def consultar_adsb_lol(icao24: str) -> dict | None:
     """
     url = f"https://api.adsb.lol/v2/icao/{icao24.lower()}"
     try:
-        resp = requests.get(url, timeout=6)
+        resp = sessao_http().get(url, timeout=6)
         resp.raise_for_status()
         data = resp.json()
         if data.get("total", 0) == 0 or "ac" not in data:
@@ -233,7 +307,7 @@ def consultar_opensky_rest(icao24: str, username=None, password=None) -> dict |
     url = "https://opensky-network.org/api/states/all"
     params = {"icao24": icao24.lower()}
     try:
-        resp = requests.get(
+        resp = sessao_http().get(
             url,
             params=params,
             timeout=10,
@@ -281,12 +355,19 @@ def consultar_aeronave(icao24: str) -> dict | None:
 # CORREÇÃO 6: ZoneInfo com fallback para UTC quando timezone do destino é inválida
 # ========================
 
-def timezone_segura(tz_str: str) -> ZoneInfo:
-    """Retorna ZoneInfo para tz_str, com fallback para UTC se inválida."""
+FUSO_BRASILIA = ZoneInfo("America/Sao_Paulo")
+FUSO_UTC      = timezone.utc
+
+# Horário de partida no formato HH:MM (00:00–23:59)
+HORARIO_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+
+
+def timezone_segura(tz_str: str) -> tzinfo:
+    """Retorna ZoneInfo para tz_str, com fallback para FUSO_UTC se inválida."""
     try:
         return ZoneInfo(tz_str)
     except (ZoneInfoNotFoundError, KeyError, Exception):
-        return ZoneInfo("UTC")
+        return FUSO_UTC
 
 
 # ========================
@@ -325,29 +406,21 @@ with st.sidebar:
         origem  = st.text_input("Código ICAO do aeroporto de origem",  value="SBGR").upper()
         destino = st.text_input("Código ICAO do aeroporto de destino", value="SBRJ").upper()
     else:
-        df_ap = df_airports.copy()
-        df_ap['country'] = df_ap['country'].fillna('Desconhecido')
-        df_ap['city']    = df_ap['city'].fillna('Desconhecido')
+        # Consultas O(1) no índice pré-computado — sem varrer o DataFrame a cada rerun
+        indice_aeroportos = indice_pais_cidade()
+        paises = list(indice_aeroportos)
 
         st.subheader("🛫 Origem")
-        pais_origem    = st.selectbox("País de origem",   sorted(df_ap['country'].unique()))
-        cidades_origem = sorted(df_ap[df_ap['country'] == pais_origem]['city'].unique())
-        cidade_origem  = st.selectbox("Cidade de origem", cidades_origem)
-        opcoes_origem  = df_ap[(df_ap['country'] == pais_origem) & (df_ap['city'] == cidade_origem)]
-        origem = st.selectbox(
-            "Aeroporto de origem",
-            opcoes_origem.index.map(lambda x: f"{x} — {opcoes_origem.loc[x]['name']}"),
-        ).split(' — ')[0]
+        pais_origem    = st.selectbox("País de origem",   paises)
+        cidade_origem  = st.selectbox("Cidade de origem", list(indice_aeroportos[pais_origem]))
+        opcoes_origem  = indice_aeroportos[pais_origem][cidade_origem]
+        origem = opcoes_origem[st.selectbox("Aeroporto de origem", list(opcoes_origem))]
 
         st.subheader("🛬 Destino")
-        pais_destino    = st.selectbox("País de destino",   sorted(df_ap['country'].unique()))
-        cidades_destino = sorted(df_ap[df_ap['country'] == pais_destino]['city'].unique())
-        cidade_destino  = st.selectbox("Cidade de destino", cidades_destino)
-        opcoes_destino  = df_ap[(df_ap['country'] == pais_destino) & (df_ap['city'] == cidade_destino)]
-        destino = st.selectbox(
-            "Aeroporto de destino",
-            opcoes_destino.index.map(lambda x: f"{x} — {opcoes_destino.loc[x]['name']}"),
-        ).split(' — ')[0]
+        pais_destino    = st.selectbox("País de destino",   paises)
+        cidade_destino  = st.selectbox("Cidade de destino", list(indice_aeroportos[pais_destino]))
+        opcoes_destino  = indice_aeroportos[pais_destino][cidade_destino]
+        destino = opcoes_destino[st.selectbox("Aeroporto de destino", list(opcoes_destino))]
 
     partida_str = st.text_input(
         "Horário de partida (HH:MM) — Fuso de Brasília",
@@ -398,23 +471,24 @@ else:
         razao_descida_fpm=razao_descida_custom,
     )
 
-tempo_teorico    = perfil['tempo_total_h']
-altitude_cruzeiro = perfil['altitude_cruzeiro_ft']
+tempo_teorico    = perfil.tempo_total_h
+altitude_cruzeiro = perfil.altitude_cruzeiro_ft
 
 horas           = int(tempo_teorico)
 minutos         = int((tempo_teorico - horas) * 60)
 tempo_formatado = f"{horas}h {minutos}min"
 
-try:
-    fuso_brasilia = ZoneInfo("America/Sao_Paulo")
-    agora         = datetime.now(fuso_brasilia)
-    partida_h, partida_m = map(int, partida_str.split(":"))
-    partida         = agora.replace(hour=partida_h, minute=partida_m, second=0, microsecond=0)
-    chegada_teorica = partida + timedelta(hours=tempo_teorico)
-except Exception:
+# Validação do horário por regex — sem try/except genérico mascarando outros erros
+m_partida = HORARIO_RE.match(partida_str.strip())
+if not m_partida:
     st.error("Horário de partida inválido. Use o formato HH:MM.")
     st.stop()
 
+partida_h, partida_m = int(m_partida.group(1)), int(m_partida.group(2))
+agora           = datetime.now(FUSO_BRASILIA)
+partida         = agora.replace(hour=partida_h, minute=partida_m, second=0, microsecond=0)
+chegada_teorica = partida + timedelta(hours=tempo_teorico)
+
 # ========================
 # Estimativa Teórica — exibição
 # ========================
@@ -432,92 +506,181 @@ st.markdown(f"""
 with st.expander("📊 Detalhes do perfil de voo"):
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Subida",  f"{perfil['subida']['dist_km']:.0f} km",
-                  f"{perfil['subida']['tempo_h']*60:.0f} min")
+        st.metric("Subida",  f"{perfil.d_subida_km:.0f} km",
+                  f"{perfil.t_subida_h*60:.0f} min")
     with col2:
-        st.metric("Cruzeiro", f"{perfil['cruzeiro']['dist_km']:.0f} km",
-                  f"{perfil['cruzeiro']['tempo_h']*60:.0f} min")
+        st.metric("Cruzeiro", f"{perfil.d_cruzeiro_km:.0f} km",
+                  f"{perfil.t_cruzeiro_h*60:.0f} min")
     with col3:
-        st.metric("Descida",  f"{perfil['descida']['dist_km']:.0f} km",
-                  f"{perfil['descida']['tempo_h']*60:.0f} min")
+        st.metric("Descida",  f"{perfil.d_descida_km:.0f} km",
+                  f"{perfil.t_descida_h*60:.0f} min")
 
 
 # ========================
-# Rastreamento em Tempo Real
+# Mapa Interativo
+#
+# Estratégia de re-render:
+#   - O objeto Folium é construído por construir_mapa(), com @st.cache_resource.
+#     Todos os parâmetros são primitivos e SEM prefixo "_", portanto entram no
+#     hash: mudar origem, destino ou posição invalida o cache corretamente
+#     (o bug antigo vinha de args "_" ignorados no hash). Estado idêntico
+#     reaproveita o mesmo objeto, sem refazer o HTML do Folium.
+#   - O controle de re-render fica por conta do parâmetro `key` do st_folium:
+#       • key NÃO muda → Streamlit reutiliza o iframe (sem flicker/reload)
+#       • key MUDA     → iframe substituído com o mapa atualizado
+#   - A posição é arredondada em 3 casas decimais (~100 m de granularidade),
+#     evitando que oscilações mínimas de GPS invalidem cache e iframe.
 # ========================
-dados_validos = False
-posicao       = None
-velocidade_kmh = 0.0
-altitude_atual_ft = altitude_cruzeiro  # fallback
 
+@st.cache_resource(max_entries=32, show_spinner=False)
+def construir_mapa(origem, destino, lat1, lon1, lat2, lon2, posicao_chave=None, icao24=""):
+    """
+    Constrói o mapa Folium da rota (e da aeronave, se posicao_chave for informada).
+    posicao_chave: (lat, lon) já arredondados, ou None sem rastreamento válido.
+    """
+    margin  = 1.5
+    min_lat = min(lat1, lat2) - margin
+    max_lat = max(lat1, lat2) + margin
+    min_lon = min(lon1, lon2) - margin
+    max_lon = max(lon1, lon2) + margin
+
+    mapa = folium.Map(
+        location=[(lat1 + lat2) / 2, (lon1 + lon2) / 2],
+        zoom_start=5,
+        width='100%',
+        height=600,
+        control_scale=True,
+    )
+
+    folium.Marker(
+        [lat1, lon1],
+        popup=f"Origem: {origem}",
+        icon=folium.Icon(color="green", icon="plane-departure", prefix="fa"),
+    ).add_to(mapa)
+
+    folium.Marker(
+        [lat2, lon2],
+        popup=f"Destino: {destino}",
+        icon=folium.Icon(color="red", icon="plane-arrival", prefix="fa"),
+    ).add_to(mapa)
+
+    folium.PolyLine(
+        locations=[[lat1, lon1], [lat2, lon2]],
+        color='blue',
+        weight=3,
+        dash_array='5, 5',
+    ).add_to(mapa)
+
+    if posicao_chave:
+        folium.Marker(
+            location=list(posicao_chave),
+            popup=f"Aeronave {icao24.upper()}",
+            icon=folium.Icon(color="blue", icon="plane", prefix="fa"),
+        ).add_to(mapa)
+        folium.PolyLine(
+            locations=[list(posicao_chave), [lat2, lon2]],
+            color='orange',
+            weight=2,
+            dash_array='10, 5',
+        ).add_to(mapa)
+
+    mapa.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
+    return mapa
+
+
+# ========================
+# Rastreamento em Tempo Real + Mapa (fragmento)
+#
+# Autorefresh via @st.fragment: a cada tick só este bloco é reexecutado —
+# sidebar, aeroportos e estimativa teórica ficam fora. O mapa entra no
+# fragmento porque exibe a posição da aeronave (sua construção está em cache).
+# Intervalo: 10 s enquanto a aeronave não é encontrada, 5 min depois.
+# ========================
+# "rastreamento_ok_icao24" guarda a aeronave encontrada no último tick; trocar de
+# aeronave ou desligar o rastreamento volta ao intervalo curto.
 if rastrear and icao24:
-    with st.spinner("🔍 Buscando dados em tempo real..."):
-        resultado = consultar_aeronave(icao24)
-
-    if resultado:
-        posicao        = (resultado["latitude"], resultado["longitude"])
-        velocidade_kmh = resultado["velocity"] or 0.0
-        altitude_atual_ft = resultado["altitude_ft"] if resultado.get("altitude_ft") else altitude_cruzeiro
-        fonte          = resultado.get("fonte", "desconhecida")
-        dados_validos  = True
-
-        distancia_restante = geodesic(posicao, (lat2, lon2)).kilometers
-
-        # Velocidades por tipo
-        if tipo_aeronave in aeronaves:
-            param        = aeronaves[tipo_aeronave]
-            vel_subida   = param['vel_subida_kmh']
+    intervalo_rastreamento = 300 if st.session_state.get("rastreamento_ok_icao24") == icao24 else 10
+else:
+    st.session_state.pop("rastreamento_ok_icao24", None)
+    intervalo_rastreamento = None
+
+
+@st.fragment(run_every=intervalo_rastreamento)
+def painel_rastreamento():
+    """Consulta a posição da aeronave, exibe o ETA por fase e renderiza o mapa."""
+    dados_validos = False
+    posicao       = None
+    velocidade_kmh = 0.0
+    altitude_atual_ft = altitude_cruzeiro  # fallback
+
+    if rastrear and icao24:
+        with st.spinner("🔍 Buscando dados em tempo real..."):
+            resultado = consultar_aeronave(icao24)
+
+        if resultado:
+            posicao        = (resultado["latitude"], resultado["longitude"])
+            velocidade_kmh = resultado["velocity"] or 0.0
+            altitude_atual_ft = resultado["altitude_ft"] if resultado.get("altitude_ft") else altitude_cruzeiro
+            fonte          = resultado.get("fonte", "desconhecida")
+            dados_validos  = True
+
+            distancia_restante = calcular_distancia(posicao[0], posicao[1], lat2, lon2)
+
+            # Velocidades e fases pré-calculadas por tipo
+            if tipo_aeronave in aeronaves:
+                param = aeronaves[tipo_aeronave]
+            else:
+                param = derivar_fases({
+                    'altitude_cruzeiro_ft': altitude_cruzeiro,
+                    'vel_subida_kmh':       vel_custom,
+                    'vel_cruzeiro_kmh':     vel_custom,
+                    'vel_descida_kmh':      vel_custom,
+                    'razao_subida_fpm':     razao_subida_custom or 2000,
+                    'razao_descida_fpm':    razao_descida_custom or 1800,
+                })
             vel_cruzeiro = param['vel_cruzeiro_kmh']
             vel_descida  = param['vel_descida_kmh']
-        else:
-            vel_subida   = vel_custom
-            vel_cruzeiro = vel_custom
-            vel_descida  = vel_custom
-
-        # CORREÇÃO 5: determinação de fase robusta para voos curtos
-        p = aeronaves.get(tipo_aeronave, {})
-        alt_cruzeiro_ref = p.get('altitude_cruzeiro_ft', altitude_cruzeiro)
-        razao_sub  = p.get('razao_subida_fpm', razao_subida_custom or 2000)
-        razao_desc = p.get('razao_descida_fpm', razao_descida_custom or 1800)
-        d_sub_ref  = vel_subida  * (alt_cruzeiro_ref / razao_sub  / 60)
-        d_desc_ref = vel_descida * (alt_cruzeiro_ref / razao_desc / 60)
-
-        if distancia_restante <= d_desc_ref:
-            fase = "descida"
-        elif altitude_atual_ft < 0.85 * alt_cruzeiro_ref:
-            fase = "subida"
-        else:
-            fase = "cruzeiro"
 
-        # ETA adaptativo por fase
-        if fase == "descida":
-            tempo_h = distancia_restante / vel_descida if vel_descida > 0 else 0
-        elif fase == "cruzeiro":
-            tempo_h = distancia_restante / vel_cruzeiro if vel_cruzeiro > 0 else 0
-        else:
-            perfil_real = calcular_perfil_de_voo(
-                distancia_total_km=distancia_restante,
-                tipo_aeronave=tipo_aeronave,
-                vel_custom=vel_custom,
-                altitude_cruzeiro_ft=altitude_cruzeiro,
-                razao_subida_fpm=razao_subida_custom,
-                razao_descida_fpm=razao_descida_custom,
-            )
-            tempo_h = perfil_real['tempo_total_h']
-
-        tempo_estimado = timedelta(hours=tempo_h)
-
-        # CORREÇÃO 6: fuso horário do destino com fallback seguro para UTC
-        tz_destino_str = destino_info.get('tz', 'UTC')
-        tz_destino     = timezone_segura(tz_destino_str)
-
-        hora_chegada_utc = datetime.utcnow().replace(tzinfo=timezone.utc) + tempo_estimado
-        hora_brasilia    = hora_chegada_utc.astimezone(ZoneInfo("America/Sao_Paulo"))
-        hora_destino     = hora_chegada_utc.astimezone(tz_destino)
-
-        st.subheader("📡 Rastreamento em Tempo Real")
-        st.caption(f"Fonte dos dados: **{fonte}**")
-        st.markdown(f"""
+            # CORREÇÃO 5: determinação de fase robusta para voos curtos
+            alt_cruzeiro_ref = param['altitude_cruzeiro_ft']
+            d_desc_ref       = param['d_descida_km']
+
+            if distancia_restante <= d_desc_ref:
+                fase = "descida"
+            elif altitude_atual_ft < 0.85 * alt_cruzeiro_ref:
+                fase = "subida"
+            else:
+                fase = "cruzeiro"
+
+            # ETA adaptativo por fase
+            if fase == "descida":
+                tempo_h = distancia_restante / vel_descida if vel_descida > 0 else 0
+            elif fase == "cruzeiro":
+                tempo_h = distancia_restante / vel_cruzeiro if vel_cruzeiro > 0 else 0
+            else:
+                perfil_real = calcular_perfil_de_voo(
+                    distancia_total_km=distancia_restante,
+                    tipo_aeronave=tipo_aeronave,
+                    vel_custom=vel_custom,
+                    altitude_cruzeiro_ft=altitude_cruzeiro,
+                    razao_subida_fpm=razao_subida_custom,
+                    razao_descida_fpm=razao_descida_custom,
+                )
+                tempo_h = perfil_real.tempo_total_h
+
+            tempo_estimado = timedelta(hours=tempo_h)
+
+            # CORREÇÃO 6: fuso horário do destino com fallback seguro para UTC
+            tz_destino_str = destino_info.get('tz', 'UTC')
+            tz_destino     = timezone_segura(tz_destino_str)
+
+            hora_chegada_utc = datetime.now(FUSO_UTC) + tempo_estimado
+            hora_brasilia    = hora_chegada_utc.astimezone(FUSO_BRASILIA)
+            hora_destino     = hora_chegada_utc.astimezone(tz_destino)
+
+            st.subheader("📡 Rastreamento em Tempo Real")
+            st.caption(f"Fonte dos dados: **{fonte}**")
+            st.markdown(f"""
 - **Posição atual:** Lat {posicao[0]:.4f}, Lon {posicao[1]:.4f}
 - **Altitude atual:** {altitude_atual_ft:,.0f} ft
 - **Velocidade:** {velocidade_kmh:.1f} km/h
@@ -526,99 +689,44 @@ if rastrear and icao24:
 - **ETA (UTC):** {hora_chegada_utc.strftime('%H:%M:%S')}
 - **ETA (Brasília):** {hora_brasilia.strftime('%H:%M:%S')}
 - **ETA ({tz_destino_str}):** {hora_destino.strftime('%H:%M:%S')}
-- **Tempo restante:** {str(tempo_estimado).split('.')[0]}
-        """)
+- **Tempo restante:** {int(tempo_h)}h {int((tempo_h % 1) * 60):02d}min
+            """)
 
-    else:
-        st.warning("⚠️ Aeronave não encontrada em nenhuma fonte. Tentando novamente em 10 segundos...")
+        else:
+            st.warning("⚠️ Aeronave não encontrada em nenhuma fonte. Tentando novamente em 10 segundos...")
 
+    st.subheader("🗺️ Mapa do Voo")
 
-# ========================
-# Autorefresh
-# ========================
-if rastrear:
-    if dados_validos:
-        st_autorefresh(interval=300_000, limit=None, key="refresh")   # 5 min
+    if posicao and dados_validos:
+        posicao_chave = (round(posicao[0], 3), round(posicao[1], 3))
+        posicao_str   = f"{posicao_chave[0]:.3f}_{posicao_chave[1]:.3f}"
     else:
-        st_autorefresh(interval=10_000,  limit=None, key="refresh")   # 10 s
+        posicao_chave = None
+        posicao_str   = "sem_posicao"
 
+    map_key = f"map_{origem}_{destino}_{posicao_str}"
 
-# ========================
-# Mapa Interativo
-#
-# Estratégia de re-render:
-#   - O objeto Folium é sempre construído com os valores atuais (sem cache).
-#     @st.cache_resource foi removido: com parâmetros prefixados por "_" o
-#     Streamlit ignora esses args no hash, fazendo o cache nunca invalidar —
-#     exatamente o bug que impedia atualização de origem, destino e posição.
-#   - O controle de re-render fica por conta do parâmetro `key` do st_folium:
-#       • key NÃO muda → Streamlit reutiliza o iframe (sem flicker/reload)
-#       • key MUDA     → iframe substituído com o mapa atualizado
-#   - A posição é arredondada em 2 casas decimais (~1 km de granularidade),
-#     evitando re-renders a cada atualização mínima de GPS.
-# ========================
-st.subheader("🗺️ Mapa do Voo")
+    mapa = construir_mapa(
+        origem, destino,
+        float(lat1), float(lon1), float(lat2), float(lon2),
+        posicao_chave,
+        icao24 if posicao_chave else "",
+    )
 
-margin  = 1.5
-min_lat = min(lat1, lat2) - margin
-max_lat = max(lat1, lat2) + margin
-min_lon = min(lon1, lon2) - margin
-max_lon = max(lon1, lon2) + margin
+    st_folium(
+        mapa,
+        width=1000,
+        height=600,
+        key=map_key,
+        returned_objects=[],  # desativa retorno de dados → menos overhead
+    )
 
-if posicao and dados_validos:
-    posicao_str = f"{posicao[0]:.2f}_{posicao[1]:.2f}"
-else:
-    posicao_str = "sem_posicao"
-
-map_key = f"map_{origem}_{destino}_{posicao_str}"
-
-# Construção direta — sem cache
-mapa = folium.Map(
-    location=[(lat1 + lat2) / 2, (lon1 + lon2) / 2],
-    zoom_start=5,
-    width='100%',
-    height=600,
-    control_scale=True,
-)
-
-folium.Marker(
-    [lat1, lon1],
-    popup=f"Origem: {origem}",
-    icon=folium.Icon(color="green", icon="plane-departure", prefix="fa"),
-).add_to(mapa)
-
-folium.Marker(
-    [lat2, lon2],
-    popup=f"Destino: {destino}",
-    icon=folium.Icon(color="red", icon="plane-arrival", prefix="fa"),
-).add_to(mapa)
-
-folium.PolyLine(
-    locations=[[lat1, lon1], [lat2, lon2]],
-    color='blue',
-    weight=3,
-    dash_array='5, 5',
-).add_to(mapa)
-
-if posicao and dados_validos:
-    folium.Marker(
-        location=posicao,
-        popup=f"Aeronave {icao24.upper()}",
-        icon=folium.Icon(color="blue", icon="plane", prefix="fa"),
-    ).add_to(mapa)
-    folium.PolyLine(
-        locations=[posicao, [lat2, lon2]],
-        color='orange',
-        weight=2,
-        dash_array='10, 5',
-    ).add_to(mapa)
+    # Mudou o estado do rastreamento (falha ↔ sucesso): rerun completo para
+    # reagendar o fragmento com o novo intervalo.
+    icao24_ok = icao24 if dados_validos else None
+    if rastrear and icao24 and icao24_ok != st.session_state.get("rastreamento_ok_icao24"):
+        st.session_state["rastreamento_ok_icao24"] = icao24_ok
+        st.rerun()
 
-mapa.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
 
-st_folium(
-    mapa,
-    width=1000,
-    height=600,
-    key=map_key,
-    returned_objects=[],  # desativa retorno de dados → menos overhead
-)
\ No newline at end of file
+painel_rastreamento()
\ No newline at end of file
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Cálculos geográficos do Flight-Tracker: haversine (Numba), em lote e k mais próximos.
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+from numba import float64, njit, vectorize
+
+RAIO_TERRA_KM = 6371.0
+
+
+def _haversine_py(lat1, lon1, lat2, lon2):
+    """
+    Distância em km pela fórmula de haversine — compilada abaixo como haversine_km.
+    Erro < 0,5% frente à geodésica elipsoidal — suficiente para estimar ETA.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi    = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    # Pontos quase antípodas: o arredondamento pode levar `a` a pouco acima de 1
+    a = min(1.0, a)
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
+
+
+# cache=True grava o código compilado em disco; se o diretório não for gravável
+# o Numba recusa já na decoração — nesse caso compila só em memória.
+# haversine_km: versão nativa (Numba) de _haversine_py.
+try:
+    haversine_km = njit(cache=True, fastmath=True)(_haversine_py)
+except Exception:
+    haversine_km = njit(fastmath=True)(_haversine_py)
+
+
+def calcular_distancia(lat1, lon1, lat2, lon2):
+    """
+    Calcula distância geográfica entre dois pontos em km.
+    Se a compilação do Numba falhar, recorre à mesma fórmula em Python puro
+    em vez de derrubar o app.
+    """
+    args = (float(lat1), float(lon1), float(lat2), float(lon2))
+    try:
+        return haversine_km(*args)
+    except Exception:
+        return _haversine_py(*args)
+
+
+@lru_cache(maxsize=None)
+def _ufunc_haversine():
+    """Compila a ufunc paralela no primeiro uso em lote — não no import do módulo."""
+    assinaturas = [float64(float64, float64, float64, float64)]
+    # Mesmo fallback de haversine_km: sem cache em disco gravável, compila só em memória
+    try:
+        return vectorize(assinaturas, target='parallel', fastmath=True, cache=True)(_haversine_py)
+    except Exception:
+        return vectorize(assinaturas, target='parallel', fastmath=True)(_haversine_py)
+
+
+def haversine_km_lote(lat1, lon1, lat2, lon2):
+    """
+    Versão em lote de haversine_km para arrays NumPy (ex.: várias aeronaves de uma vez).
+    Faz broadcast como qualquer ufunc e distribui o laço entre os núcleos da CPU:
+    dists = haversine_km_lote(lats, lons, lat_destino, lon_destino)
+    """
+    return _ufunc_haversine()(lat1, lon1, lat2, lon2)
+
+
+def indices_mais_proximos(lat_rad, lon_rad, lat, lon, k=5):
+    """
+    Índices e distâncias (km) dos k pontos de (lat_rad, lon_rad) mais próximos de
+    (lat, lon), do mais perto ao mais longe. Haversine vetorizado + np.argpartition.
+    """
+    phi = math.radians(lat)
+    dphi    = lat_rad - phi
+    dlambda = lon_rad - math.radians(lon)
+    a = np.sin(dphi * 0.5) ** 2 + math.cos(phi) * np.cos(lat_rad) * np.sin(dlambda * 0.5) ** 2
+    dist_km = 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    k = min(k, dist_km.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    idx = np.argpartition(dist_km, k - 1)[:k]
+    idx = idx[np.argsort(dist_km[idx])]
+    return idx, dist_km[idx]
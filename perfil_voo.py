@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Perfil de voo do Flight-Tracker: fases de subida, cruzeiro e descida.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+CAMPOS_SOA = ('vel_cruzeiro_kmh', 't_subida_h', 't_descida_h', 'd_subida_km', 'd_descida_km')
+
+
+class PerfilVoo(NamedTuple):
+    """Perfil de voo por fase — distâncias em km, tempos em horas."""
+    d_subida_km: float
+    t_subida_h: float
+    d_cruzeiro_km: float
+    t_cruzeiro_h: float
+    d_descida_km: float
+    t_descida_h: float
+    tempo_total_h: float
+    altitude_cruzeiro_ft: int
+
+
+@lru_cache(maxsize=512)
+def calcular_perfil_base(
+    distancia_total_km: float,
+    altitude_cruzeiro_ft: int,
+    vel_subida_kmh: float,
+    vel_cruzeiro_kmh: float,
+    vel_descida_kmh: float,
+    t_subida_h: float,
+    t_descida_h: float,
+    d_subida_km: float,
+    d_descida_km: float,
+) -> PerfilVoo:
+    """
+    Calcula o perfil de voo com subida e descida já derivadas (derivar_fases).
+    CORREÇÃO 5: em voos curtos (subida + descida > distância) não há cruzeiro.
+    """
+    tempo_subida_h  = t_subida_h
+    tempo_descida_h = t_descida_h
+
+    # CORREÇÃO 5: voo curto — subida e descida somadas superam a distância total
+    d_fases_extremas = d_subida_km + d_descida_km
+    if distancia_total_km <= d_fases_extremas:
+        # Sem fase de cruzeiro: distribui proporcionalmente
+        proporcao = distancia_total_km / d_fases_extremas
+        d_subida_km   = d_subida_km  * proporcao
+        d_descida_km  = d_descida_km * proporcao
+        tempo_subida_h  = d_subida_km  / vel_subida_kmh  if vel_subida_kmh  > 0 else 0
+        tempo_descida_h = d_descida_km / vel_descida_kmh if vel_descida_kmh > 0 else 0
+        d_cruzeiro_km = 0.0
+        t_cruzeiro_h  = 0.0
+    else:
+        d_cruzeiro_km = distancia_total_km - d_fases_extremas
+        t_cruzeiro_h  = d_cruzeiro_km / vel_cruzeiro_kmh if vel_cruzeiro_kmh > 0 else 0
+
+    tempo_total_h = tempo_subida_h + t_cruzeiro_h + tempo_descida_h
+
+    return PerfilVoo(
+        d_subida_km, tempo_subida_h,
+        d_cruzeiro_km, t_cruzeiro_h,
+        d_descida_km, tempo_descida_h,
+        tempo_total_h,
+        altitude_cruzeiro_ft,
+    )
+
+
+def catalogo_soa(aeronaves: dict) -> tuple:
+    """
+    Converte o catálogo (com as fases já derivadas) para layout SoA:
+    (chaves, {campo: array float32}), um array por campo na ordem das chaves.
+    """
+    chaves = tuple(aeronaves)
+    soa = {
+        campo: np.array([aeronaves[k][campo] for k in chaves], dtype=np.float32)
+        for campo in CAMPOS_SOA
+    }
+    return chaves, soa
+
+
+def perfil_em_lote(soa: dict, distancia_total_km: float) -> np.ndarray:
+    """
+    Tempo total de voo (h) de cada aeronave de soa (ver catalogo_soa) para a mesma
+    distância — o modelo de calcular_perfil_base, vetorizado.
+    """
+    d_extremas = soa['d_subida_km'] + soa['d_descida_km']
+    t_extremas = soa['t_subida_h']  + soa['t_descida_h']
+    distancia  = np.float32(distancia_total_km)
+    # Voo curto (sem cruzeiro): subida e descida escalam pela mesma proporção
+    return np.where(
+        distancia <= d_extremas,
+        t_extremas * (distancia / d_extremas),
+        t_extremas + (distancia - d_extremas) / soa['vel_cruzeiro_kmh'],
+    )
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import math
+
+import numpy as np
+import pytest
+
+from geo import (
+    RAIO_TERRA_KM,
+    _haversine_py,
+    calcular_distancia,
+    haversine_km_lote,
+    indices_mais_proximos,
+)
+
+
+def test_distancia_sbgr_sbrj():
+    # Guarulhos → Santos Dumont: ~340 km
+    assert calcular_distancia(-23.4356, -46.4731, -22.9105, -43.1631) == pytest.approx(343, abs=2)
+
+
+def test_distancia_mesmo_ponto_e_zero():
+    assert calcular_distancia(-15.87, -47.92, -15.87, -47.92) == pytest.approx(0.0, abs=1e-9)
+
+
+@pytest.mark.parametrize("haversine", [_haversine_py, calcular_distancia])
+def test_pontos_antipodas_nao_estouram(haversine):
+    d = haversine(10.0, 20.0, -10.0, -160.0)
+    assert not math.isnan(d)
+    assert d == pytest.approx(math.pi * RAIO_TERRA_KM)
+
+
+def test_haversine_lote_igual_ao_escalar():
+    lats = np.array([-23.4356, -15.87, 10.0])
+    lons = np.array([-46.4731, -47.92, 20.0])
+    esperado = [_haversine_py(la, lo, -22.9105, -43.1631) for la, lo in zip(lats, lons)]
+    assert haversine_km_lote(lats, lons, -22.9105, -43.1631) == pytest.approx(esperado)
+
+
+def test_aeroportos_mais_proximos_incluem_o_proprio():
+    airportsdata = pytest.importorskip("airportsdata")
+    base = airportsdata.load('ICAO')
+    icaos = [c for c, a in base.items() if a['lat'] is not None and a['lon'] is not None]
+    lat_rad = np.radians(np.array([base[c]['lat'] for c in icaos], dtype=np.float64))
+    lon_rad = np.radians(np.array([base[c]['lon'] for c in icaos], dtype=np.float64))
+
+    sbgr = base['SBGR']
+    idx, dist_km = indices_mais_proximos(lat_rad, lon_rad, sbgr['lat'], sbgr['lon'], k=5)
+
+    assert len(idx) == 5
+    assert icaos[idx[0]] == 'SBGR'
+    assert dist_km[0] == pytest.approx(0.0, abs=1e-6)
+    assert list(dist_km) == sorted(dist_km)
+
+
+def test_mais_proximos_k_maior_que_a_base():
+    lat_rad = np.radians(np.array([0.0, 1.0]))
+    lon_rad = np.radians(np.array([0.0, 1.0]))
+    idx, dist_km = indices_mais_proximos(lat_rad, lon_rad, 0.9, 0.9, k=5)
+    assert list(idx) == [1, 0]
+    assert len(dist_km) == 2
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from perfil_voo import PerfilVoo, calcular_perfil_base, catalogo_soa, perfil_em_lote
+
+# A319 do catálogo: 35000 ft, subida 2000 fpm @ 450 km/h, descida 1800 fpm @ 540 km/h
+T_SUB, T_DES = 35000 / 2000 / 60, 35000 / 1800 / 60
+D_SUB, D_DES = 450 * T_SUB, 540 * T_DES
+
+
+def perfil(distancia):
+    return calcular_perfil_base(distancia, 35000, 450.0, 756.0, 540.0, T_SUB, T_DES, D_SUB, D_DES)
+
+
+def test_voo_com_cruzeiro():
+    p = perfil(1000.0)
+    assert isinstance(p, PerfilVoo)
+    assert p.d_subida_km + p.d_cruzeiro_km + p.d_descida_km == pytest.approx(1000.0)
+    assert p.tempo_total_h == pytest.approx(p.t_subida_h + p.t_cruzeiro_h + p.t_descida_h)
+    assert p.altitude_cruzeiro_ft == 35000
+
+
+def test_voo_curto_sem_cruzeiro():
+    p = perfil(100.0)
+    assert p.d_cruzeiro_km == 0.0 and p.t_cruzeiro_h == 0.0
+    assert p.d_subida_km + p.d_descida_km == pytest.approx(100.0)
+
+
+def test_resultado_memoizado():
+    assert perfil(1234.5) is perfil(1234.5)
+
+
+@pytest.mark.parametrize("distancia", [100.0, 1000.0, 5000.0])  # curto e com cruzeiro
+def test_perfil_em_lote_igual_ao_escalar(distancia):
+    catalogo = {
+        'A319': {'vel_cruzeiro_kmh': 756.0, 't_subida_h': T_SUB, 't_descida_h': T_DES,
+                 'd_subida_km': D_SUB, 'd_descida_km': D_DES},
+        'Lento': {'vel_cruzeiro_kmh': 400.0, 't_subida_h': 0.2, 't_descida_h': 0.25,
+                  'd_subida_km': 60.0, 'd_descida_km': 80.0},
+    }
+    chaves, soa = catalogo_soa(catalogo)
+    assert chaves == ('A319', 'Lento')
+
+    tempos = perfil_em_lote(soa, distancia)
+    for tempo, k in zip(tempos, chaves):
+        p = catalogo[k]
+        vel_sub, vel_des = p['d_subida_km'] / p['t_subida_h'], p['d_descida_km'] / p['t_descida_h']
+        esperado = calcular_perfil_base(
+            distancia, 35000, vel_sub, p['vel_cruzeiro_kmh'], vel_des,
+            p['t_subida_h'], p['t_descida_h'], p['d_subida_km'], p['d_descida_km'],
+        ).tempo_total_h
+        assert tempo == pytest.approx(esperado, abs=1e-5)
+